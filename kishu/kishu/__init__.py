@@ -1,10 +1,17 @@
 __app_name__ = "kishu"
 __version__ = "0.2.0"
 
-# This allows `%load_ext kishu` in Jupyter.
-# Then, `%lsmagic` includes kishu functions.
-# kishu can be enabled with `%kishu enable` to enable automatic tracing.
-from .jupyterint import init_kishu, detach_kishu
+
+def __getattr__(name):
+    # This allows `%load_ext kishu` in Jupyter.
+    # Then, `%lsmagic` includes kishu functions.
+    # kishu can be enabled with `%kishu enable` to enable automatic tracing.
+    # Imported lazily so that importing kishu submodules (e.g., the CLI) does not load the planner stack.
+    if name in ('init_kishu', 'detach_kishu'):
+        from . import jupyterint
+        return getattr(jupyterint, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     '__app_name__',
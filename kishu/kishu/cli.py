@@ -7,25 +7,26 @@ import typer
 
 from abc import ABC, abstractmethod
 from functools import wraps
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Tuple
 
 from kishu import __app_name__, __version__
-from kishu.commands import (
-    CheckoutResult,
-    CommitResult,
-    CommitSummary,
-    DetachResult,
-    InitResult,
-    InstrumentResult,
-    InstrumentStatus,
-    into_json,
-    KishuCommand,
-    LogAllResult,
-    LogResult,
-)
 from kishu.notebook_id import NotebookId
 from kishu.storage.config import Config
 
+# kishu.commands (and through it, the planner) is imported inside each command to keep CLI startup fast, e.g.,
+# for --help.
+if TYPE_CHECKING:
+    from kishu.commands import (
+        CheckoutResult,
+        CommitResult,
+        CommitSummary,
+        DetachResult,
+        InitResult,
+        InstrumentResult,
+        LogAllResult,
+        LogResult,
+    )
+
 
 class CommitPrinter(ABC):
     def __init__(self, indentation: str = "    "):
@@ -168,6 +169,8 @@ def print_reattachment_message(response: InstrumentResult):
     """
     Prints reattachment message, returns whether or not to print the actual response message
     """
+    from kishu.commands import InstrumentStatus
+
     if response.status == InstrumentStatus.already_attached:
         return True
     if response.status in [InstrumentStatus.reattach_succeeded, InstrumentStatus.reattach_init_fail]:
@@ -258,6 +261,7 @@ def list(
     """
     List existing Kishu sessions.
     """
+    from kishu.commands import KishuCommand, into_json
     print(into_json(KishuCommand.list(list_all=list_all)))
 
 
@@ -273,6 +277,7 @@ def init(
     """
     Initialize Kishu instrumentation in a notebook.
     """
+    from kishu.commands import KishuCommand
     print_init_message(KishuCommand.init(notebook_path))
 
 
@@ -288,6 +293,7 @@ def detach(
     """
     Detach Kishu instrumentation from notebook
     """
+    from kishu.commands import KishuCommand
     print_detach_message(KishuCommand.detach(notebook_path), notebook_path)
 
 
@@ -318,6 +324,7 @@ def log(
     """
     Show a history view of commit graph.
     """
+    from kishu.commands import KishuCommand
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     if log_all:
         log_all_result = KishuCommand.log_all(notebook_key)
@@ -342,6 +349,7 @@ def status(
     """
     Show a commit in detail.
     """
+    from kishu.commands import KishuCommand, into_json
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     print(into_json(KishuCommand.status(notebook_key, commit_id)))
 
@@ -375,6 +383,7 @@ def commit(
     """
     Create or edit a Kishu commit.
     """
+    from kishu.commands import KishuCommand, into_json
     if edit_branch_or_commit_id:
         print(into_json(KishuCommand.edit_commit(
             notebook_path_or_key,
@@ -408,6 +417,7 @@ def checkout(
     """
     Checkout a notebook to a commit.
     """
+    from kishu.commands import KishuCommand
     print_checkout_message(KishuCommand.checkout(
         notebook_path_or_key,
         branch_or_commit_id,
@@ -455,6 +465,7 @@ def branch(
     """
     Create, rename, or delete branches.
     """
+    from kishu.commands import KishuCommand, into_json
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     if create_branch_name is not None:
         print(into_json(KishuCommand.branch(notebook_key, create_branch_name, commit_id)))
@@ -508,6 +519,7 @@ def tag(
     """
     Create or edit tags.
     """
+    from kishu.commands import KishuCommand, into_json
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     if list_tag:
         print(into_json(KishuCommand.list_tag(notebook_key)))
@@ -536,6 +548,7 @@ def fegraph(
     """
     Show the frontend commit graph.
     """
+    from kishu.commands import KishuCommand, into_json
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     print(into_json(KishuCommand.fe_commit_graph(notebook_key)))
 
@@ -557,6 +570,7 @@ def fecommit(
     """
     Show the commit in frontend detail.
     """
+    from kishu.commands import KishuCommand, into_json
     notebook_key = NotebookId.parse_key_from_path_or_key(notebook_path_or_key)
     print(into_json(KishuCommand.fe_commit(notebook_key, commit_id, vardepth)))
 
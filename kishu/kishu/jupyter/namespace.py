@@ -64,7 +64,8 @@ class Namespace:
         return key in self._tracked_namespace
 
     def __getitem__(self, key) -> Any:
-        return dict(self._tracked_namespace.items())[key]
+        # Bypass TrackedNamespace.__getitem__ to not record the access, without copying the namespace.
+        return dict.__getitem__(self._tracked_namespace, key)
 
     def __delitem__(self, key) -> Any:
         del self._tracked_namespace[key]
@@ -5,13 +5,32 @@ import time
 
 from collections import defaultdict
 from dataclasses import dataclass, field
+from functools import wraps
 from itertools import chain
-from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple, TypeVar
 
 from kishu.exceptions import MissingHistoryError
 from kishu.jupyter.namespace import Namespace
 
 
+T = TypeVar("T")
+
+
+def _cached_on_version(fn: Callable[[AHG], T]) -> Callable[[AHG], T]:
+    """
+        Memoizes an AHG accessor until the next change to the graph (i.e. a bump of AHG._version).
+        The cached value is shared between callers and must not be mutated.
+    """
+    @wraps(fn)
+    def wrapper(ahg: AHG) -> T:
+        version, value = ahg._cache.get(fn.__name__, (-1, None))
+        if version != ahg._version:
+            value = fn(ahg)
+            ahg._cache[fn.__name__] = (ahg._version, value)
+        return value
+    return wrapper
+
+
 @dataclass
 class CellExecution:
     """
@@ -93,6 +112,22 @@ class AHG:
         # The values are a subset of self._variable_snapshots.
         self._active_variable_snapshots: Dict[FrozenSet[str], VariableSnapshot] = {}
 
+        # Incremented on every change to the active variable snapshots; versions the cache of derived lookups.
+        self._version: int = 0
+        self._cache: Dict[str, Tuple[int, Any]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The cache of derived lookups is not serialized.
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # AHGs serialized before the cache was introduced have neither a version nor a cache.
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_version", 0)
+        self.__dict__.setdefault("_cache", {})
+
     @staticmethod
     def from_existing(user_ns: Namespace) -> AHG:
         ahg = AHG()
@@ -185,6 +220,7 @@ class AHG:
             @param deleted_variables: set of deleted variables.
         """
         cell = "" if not cell else cell
+        self._version += 1
 
         # Retrieve input variable snapshots. A VS is an input if any of the names in its connected component are accessed.
         input_vss = [vs for vs in self._active_variable_snapshots.values() if vs.name.intersection(input_variables)]
@@ -229,12 +265,14 @@ class AHG:
     def get_variable_snapshots(self) -> List[VariableSnapshot]:
         return self._variable_snapshots
 
+    @_cached_on_version
     def get_active_variable_snapshots(self) -> List[VariableSnapshot]:
         return list(self._active_variable_snapshots.values())
 
     def get_active_variable_snapshots_dict(self) -> Dict[FrozenSet[str], VariableSnapshot]:
         return self._active_variable_snapshots
 
+    @_cached_on_version
     def get_variable_names(self) -> Set[str]:
         # Return all variable KVs in components as a flattened set.
         return set(chain.from_iterable(self._active_variable_snapshots.keys()))
@@ -267,6 +305,7 @@ class AHG:
         return dill.loads(active_vs_string.encode('latin1'))
 
     def replace_active_vses(self, versioned_names: List[VersionedName]) -> None:
+        self._version += 1
         self._active_variable_snapshots.clear()
         for versioned_name in versioned_names:
             self._active_variable_snapshots[versioned_name.name] = self._variable_snapshots[versioned_name]
@@ -1,5 +1,6 @@
 import pandas
 import pickle
+import struct
 import xxhash
 from typing import Optional
 
@@ -18,63 +19,75 @@ def is_pickable(obj) -> bool:
         return False
 
 
+def int_to_bytes(value: int) -> bytes:
+    """
+    Encodes an int (e.g., a primitive or an object id) as its minimal little-endian two's complement bytes.
+    """
+    return value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+
+
 class hash_vis(Visitor):
     def check_visited(self, visited: set, obj_id: int, obj_type: type, include_id: bool,
-                      hash_state: xxhash.xxh32) -> Optional[xxhash.xxh32]:
+                      hash_state: xxhash.xxh3_128) -> Optional[xxhash.xxh3_128]:
         if obj_id in visited:
-            hash_state.update(str(obj_type))
+            hash_state.update(str(obj_type).encode())
             if include_id:
-                hash_state.update(str(obj_id))
+                hash_state.update(int_to_bytes(obj_id))
             return hash_state
         else:
             return None
 
-    def visit_primitive(self, obj, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
-        hash_state.update(str(obj))
-        hash_state.update("/EOC")
+    def visit_primitive(self, obj, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
+        if isinstance(obj, int):
+            hash_state.update(int_to_bytes(obj))
+        elif isinstance(obj, float):
+            hash_state.update(struct.pack("<d", obj))
+        else:
+            hash_state.update(str(obj).encode("utf-8", "surrogatepass"))
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_tuple(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_tuple(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         for item in obj:
             object_state.get_object_state(
                 item, visited, visitor=self, include_id=include_id, hash_state=hash_state)
 
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_list(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_list(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         visited.add(id(obj))
         if include_id:
-            hash_state.update(str(id(obj)))
+            hash_state.update(int_to_bytes(id(obj)))
 
         for item in obj:
             object_state.get_object_state(
                 item, visited, visitor=self, include_id=include_id, hash_state=hash_state)
 
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_set(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_set(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         visited.add(id(obj))
         if include_id:
-            hash_state.update(str(id(obj)))
+            hash_state.update(int_to_bytes(id(obj)))
 
         for item in sorted(obj):
             object_state.get_object_state(
                 item, visited, visitor=self, include_id=include_id, hash_state=hash_state)
 
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_dict(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_dict(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         visited.add(id(obj))
         if include_id:
-            hash_state.update(str(id(obj)))
+            hash_state.update(int_to_bytes(id(obj)))
 
         for key, value in sorted(obj.items()):
             object_state.get_object_state(
@@ -82,54 +95,54 @@ class hash_vis(Visitor):
             object_state.get_object_state(
                 value, visited, visitor=self, include_id=include_id, hash_state=hash_state)
 
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_byte(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_byte(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         hash_state.update(obj)
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_type(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
-        hash_state.update(str(obj))
+    def visit_type(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
+        hash_state.update(str(obj).encode())
         return hash_state
 
-    def visit_callable(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
-        hash_state.update(str(type(obj)))
+    def visit_callable(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
+        hash_state.update(str(type(obj)).encode())
         if include_id:
             visited.add(id(obj))
-            hash_state.update(str(id(obj)))
+            hash_state.update(int_to_bytes(id(obj)))
 
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_custom_obj(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
+    def visit_custom_obj(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
         visited.add(id(obj))
-        hash_state.update(str(type(obj)))
+        hash_state.update(str(type(obj)).encode())
 
         if is_pickable(obj):
             reduced = obj.__reduce_ex__(4)
             if not isinstance(obj, pandas.core.indexes.range.RangeIndex):
-                hash_state.update(str(id(obj)))
+                hash_state.update(int_to_bytes(id(obj)))
 
             if isinstance(reduced, str):
-                hash_state.update(reduced)
+                hash_state.update(reduced.encode())
                 return hash_state
 
             for item in reduced[1:]:
                 object_state.get_object_state(
                     item, visited, visitor=self, include_id=False, hash_state=hash_state)
 
-            hash_state.update("/EOC")
+            hash_state.update(b"/EOC")
         return hash_state
 
-    def visit_other(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh32) -> xxhash.xxh32:
+    def visit_other(self, obj, visited: set, include_id: bool, hash_state: xxhash.xxh3_128) -> xxhash.xxh3_128:
         visited.add(id(obj))
-        hash_state.update(str(type(obj)))
+        hash_state.update(str(type(obj)).encode())
         if include_id:
-            hash_state.update(str(id(obj)))
+            hash_state.update(int_to_bytes(id(obj)))
         hash_state.update(pickle.dumps(obj))
-        hash_state.update("/EOC")
+        hash_state.update(b"/EOC")
         return hash_state
@@ -15,7 +15,7 @@ import uuid
 import xxhash
 
 from matplotlib.contour import QuadContourSet
-from typing import Any, List, Optional, Set
+from typing import Any, FrozenSet, List, Optional, Tuple
 from types import GeneratorType, FunctionType
 
 
@@ -29,7 +29,8 @@ class GraphNode:
         self.children: List[Any] = []
         self.obj_type = obj_type
 
-        self.cached_id_set: Optional[Set[Any]] = None
+        # IDs of the (mutable) objects reachable from this node, i.e., the objects which may be shared by reference.
+        self.shared_ids: Optional[FrozenSet[int]] = None
         self.cached_list: Optional[List[Any]] = None
         self.cached_list_not_check_value: Optional[List[Any]] = None
         self.cached_list_not_check_id_obj: Optional[List[Any]] = None
@@ -54,15 +55,13 @@ class GraphNode:
         if check_value:
             return self.cached_list_not_check_id_obj
 
-    def id_set(self) -> Set[Any]:
-        if not self.cached_id_set:
-            self.cached_id_set = set([i for i in self.convert_to_list(check_value=False) if isinstance(i, int)])
-        return self.cached_id_set
+    def id_set(self) -> FrozenSet[int]:
+        if self.shared_ids is None:
+            self.shared_ids = GraphNode._collect_shared_ids(self)
+        return self.shared_ids
 
     def is_overlap(self, other: GraphNode) -> bool:
-        if self.id_set().intersection(other.id_set()):
-            return True
-        return False
+        return not self.id_set().isdisjoint(other.id_set())
 
     def is_root_id_and_type_equals(self, other):
         """
@@ -76,6 +75,23 @@ class GraphNode:
     def __eq__(self, other):
         return GraphNode._compare_idgraph(self, other, check_id_obj=True)
 
+    @staticmethod
+    def _collect_shared_ids(node: GraphNode) -> FrozenSet[int]:
+        # Only nodes of mutable objects store their ID (in id_obj), hence immutables are skipped.
+        # Iterative to not hit the recursion limit on deep graphs.
+        shared_ids = set()
+        visited = {id(node)}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current.id_obj, int):
+                shared_ids.add(current.id_obj)
+            for child in current.children:
+                if isinstance(child, GraphNode) and id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append(child)
+        return frozenset(shared_ids)
+
     @staticmethod
     def _convert_idgraph_to_list(
         node: GraphNode,
@@ -129,6 +145,46 @@ class GraphNode:
 
         return True
 
+    @staticmethod
+    def _compare_idgraph_value_and_structure(
+        idGraph1: GraphNode,
+        idGraph2: GraphNode,
+        visited1: set,
+        visited2: set,
+    ) -> Tuple[bool, bool]:
+        # Lockstep pre order traversal of both graphs. Returns early once values differ, as the structures then
+        # also differ.
+        if idGraph1.obj_type != idGraph2.obj_type:
+            return False, False
+        structure_equals = idGraph1.id_obj == idGraph2.id_obj
+
+        is_cyclic1, is_cyclic2 = id(idGraph1) in visited1, id(idGraph2) in visited2
+        if is_cyclic1 or is_cyclic2:
+            return is_cyclic1 == is_cyclic2, is_cyclic1 == is_cyclic2 and structure_equals
+
+        visited1.add(id(idGraph1))
+        visited2.add(id(idGraph2))
+
+        if len(idGraph1.children) != len(idGraph2.children):
+            return False, False
+
+        for child1, child2 in zip(idGraph1.children, idGraph2.children):
+            if isinstance(child1, GraphNode) and isinstance(child2, GraphNode):
+                child_value_equals, child_structure_equals = GraphNode._compare_idgraph_value_and_structure(
+                    child1, child2, visited1, visited2)
+                if not child_value_equals:
+                    return False, False
+                structure_equals = structure_equals and child_structure_equals
+            elif isinstance(child1, GraphNode) or isinstance(child2, GraphNode):
+                return False, False
+            elif pandas.isnull(child1):
+                if not pandas.isnull(child2):
+                    return False, False
+            elif child1 != child2:
+                return False, False
+
+        return True, structure_equals
+
 
 def is_pickable(obj):
     try:
@@ -150,17 +206,28 @@ def value_equals(idGraph1: GraphNode, idGraph2: GraphNode):
     return GraphNode._compare_idgraph(idGraph1, idGraph2, check_id_obj=False)
 
 
-def get_object_state(obj, visited: dict, include_id=True, first_creation=False) -> GraphNode:
-    if id(obj) in visited.keys():
-        return visited[id(obj)]
+def value_and_structure_equals(idGraph1: GraphNode, idGraph2: GraphNode) -> Tuple[bool, bool]:
+    """
+        Compare 2 ID graphs both by value (as value_equals) and by structure (as ==) in a single traversal.
+        Returns a (value equality, structure equality) pair. Structure equality implies value equality.
+        Used by the planner to detect modified variables after each cell execution.
+    """
+    return GraphNode._compare_idgraph_value_and_structure(idGraph1, idGraph2, set(), set())
+
 
+def get_object_state(obj, visited: dict, include_id=True, first_creation=False) -> GraphNode:
+    # Primitives are never added to visited as they cannot form cycles, so skip the visited check for them.
     if isinstance(obj, (int, float, str, bool, type(None), type(NotImplemented), type(Ellipsis), FunctionType)):
         node = GraphNode(obj_type=type(obj))
         node.children.append(obj)
         node.children.append("/EOC")
         return node
 
-    elif isinstance(obj, tuple):
+    visited_node = visited.get(id(obj))
+    if visited_node is not None:
+        return visited_node
+
+    if isinstance(obj, tuple):
         node = GraphNode(obj_type=type(obj))
         for item in obj:
             child = get_object_state(item, visited, include_id, first_creation)
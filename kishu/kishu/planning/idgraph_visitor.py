@@ -1,5 +1,7 @@
+import numpy
 import pandas
 import pickle
+import xxhash
 from typing import Any, List, Optional
 
 import kishu.planning.object_state as object_state
@@ -17,6 +19,36 @@ def is_pickable(obj) -> bool:
         return False
 
 
+def is_buffer_dtype(dtype) -> bool:
+    """
+    Whether values of the dtype are fully stored in the array buffer, i.e., it is a numpy dtype without objects.
+    Pandas extension dtypes (e.g., Int64, category, string) are not numpy dtypes.
+    """
+    return isinstance(dtype, numpy.dtype) and not dtype.hasobject
+
+
+def hash_array_like(obj) -> Optional[int]:
+    """
+    Hashes the underlying buffers of numpy arrays and pandas dataframes in bulk instead of traversing them
+    element by element. Returns None for other objects, in which case the object is traversed as usual.
+    Subclasses (e.g., masked arrays) may hold state outside of the buffer and are also traversed. So are arrays
+    and dataframes with object or extension dtypes: hash_pandas_object only hashes the str() of objects, which
+    does not change when they are modified in place.
+    """
+    if type(obj) is numpy.ndarray and is_buffer_dtype(obj.dtype):
+        h = xxhash.xxh3_128(str((obj.dtype, obj.shape)).encode())
+        h.update(numpy.ascontiguousarray(obj).data)
+        return h.intdigest()
+
+    if type(obj) is pandas.DataFrame and is_buffer_dtype(obj.index.dtype) and \
+            all(is_buffer_dtype(dtype) for dtype in obj.dtypes):
+        h = xxhash.xxh3_128(str((list(obj.columns), list(obj.dtypes))).encode())
+        h.update(pandas.util.hash_pandas_object(obj, index=True).values.tobytes())
+        return h.intdigest()
+
+    return None
+
+
 class GraphNode:
     """
     A node in the idgraph. Each node conatins a obj_type, id_obj, check_value_only, and children
@@ -47,10 +79,7 @@ class GraphNode:
 class idgraph(Visitor):
     def check_visited(self, visited: dict, obj_id: int, obj_type: type, include_id: bool,
                       hash_state: None) -> Optional[GraphNode]:
-        if obj_id in visited.keys():
-            return visited[obj_id]
-        else:
-            return None
+        return visited.get(obj_id)
 
     def visit_primitive(self, obj, hash_state) -> GraphNode:
         node = GraphNode(obj_type=type(obj), check_value_only=True)
@@ -147,6 +176,14 @@ class idgraph(Visitor):
     def visit_custom_obj(self, obj, visited: dict, include_id: bool, hash_state: None) -> GraphNode:
         node = GraphNode(obj_type=type(obj), check_value_only=True)
         visited[id(obj)] = node
+        array_hash = hash_array_like(obj)
+        if array_hash is not None:
+            node.id_obj = id(obj)
+            node.check_value_only = False
+            node.children.append(array_hash)
+            node.children.append("/EOC")
+            return node
+
         if is_pickable(obj):
             reduced = obj.__reduce_ex__(4)
             if not isinstance(obj, pandas.core.indexes.range.RangeIndex):
@@ -170,6 +207,12 @@ class idgraph(Visitor):
         if include_id:
             node.id_obj = id(obj)
             node.check_value_only = False
+        array_hash = hash_array_like(obj)
+        if array_hash is not None:
+            node.children.append(array_hash)
+            node.children.append("/EOC")
+            return node
+
         # node.children.append(str(obj))
         node.children.append(pickle.dumps(obj))
         node.children.append("/EOC")
@@ -14,7 +14,7 @@ def create_idgraph(obj):
 
 def create_hash(obj):
     vis1 = hash_visitor.hash_vis()
-    x = xxhash.xxh32()
+    x = xxhash.xxh3_128()
     return get_object_state(obj, set(), vis1, x, True)
 
 
@@ -32,15 +32,16 @@ def get_object_state(obj, visited, visitor: Visitor, hash_state=None, include_id
              In case of xxhash, the output is hash object which is recursively updated as it
                 traverses the object. Return value is the xxhash object
     """
+    # Primitives are never added to visited as they cannot form cycles, so skip the visited check for them.
+    if isinstance(obj, (int, float, bool, str, type(None), type(NotImplemented), type(Ellipsis))):
+        return visitor.visit_primitive(obj, hash_state)
+
     ret = visitor.check_visited(
         visited, id(obj), type(obj), include_id, hash_state)
     if ret:
         return ret
 
-    if isinstance(obj, (int, float, bool, str, type(None), type(NotImplemented), type(Ellipsis))):
-        return visitor.visit_primitive(obj, hash_state)
-
-    elif isinstance(obj, tuple):
+    if isinstance(obj, tuple):
         return visitor.visit_tuple(obj, visited, include_id, hash_state)
 
     elif isinstance(obj, list):
@@ -20,6 +20,8 @@ class PlannerContext:
     """
         Optimizer-related config options.
     """
+    __slots__ = ("always_recompute", "always_migrate", "network_bandwidth")
+
     always_recompute: bool
     always_migrate: bool
     network_bandwidth: float
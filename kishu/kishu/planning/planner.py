@@ -3,14 +3,15 @@ from __future__ import annotations
 import time
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from itertools import chain, combinations
-from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from itertools import chain
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 
 from kishu.jupyter.namespace import Namespace
 
-from kishu.planning.ahg import AHG, VersionedName
-from kishu.planning.idgraph import GraphNode, get_object_state, value_equals
+from kishu.planning.ahg import AHG, VersionedName, VersionedNameContext
+from kishu.planning.idgraph import PRIMITIVES, GraphNode, get_object_state, value_and_structure_equals
 from kishu.planning.optimizer import Optimizer
 from kishu.planning.plan import CheckpointPlan, IncrementalCheckpointPlan, RestorePlan
 from kishu.planning.profiler import profile_variable_size
@@ -18,17 +19,40 @@ from kishu.storage.checkpoint import KishuCheckpoint
 from kishu.storage.config import Config
 
 
+IMMUTABLE_TYPES = {type(None), int, float, complex, bool, str, bytes, tuple, frozenset}
+
+
+def is_deeply_immutable(obj: Any) -> bool:
+    """
+        Whether the object and all objects it contains are of immutable builtin types. The value of such an object
+        cannot change while the object is alive.
+    """
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if type(obj) not in IMMUTABLE_TYPES:
+            return False
+        if type(obj) in (tuple, frozenset):
+            stack.extend(obj)
+    return True
+
+
 @dataclass
 class PlannerContext:
     """
         Planner-related config options.
     """
+    __slots__ = ("incremental_store", "incremental_load", "parallel_idgraph")
+
     incremental_store: bool
     incremental_load: bool  # Not used yet
+    parallel_idgraph: bool
 
 
 @dataclass
 class ChangedVariables:
+    __slots__ = ("created_vars", "modified_vars_value", "modified_vars_structure", "deleted_vars")
+
     created_vars: Set[str]
 
     # Modified vars by value equality , i.e., a == b.
@@ -60,12 +84,33 @@ class CheckpointRestorePlanner:
         self._id_graph_map: Dict[str, GraphNode] = {}
         self._pre_run_cell_vars: Set[str] = set()
 
+        # ID graphs built during the current update, keyed by root object ID and storing the root object type.
+        # Only valid while the namespace is not being modified, hence cleared at the start of each update.
+        self._idgraph_cache: Dict[int, Tuple[type, GraphNode]] = {}
+
+        # Profiled sizes of active VSes. A VS gets a new version whenever it is modified, hence sizes of unchanged
+        # VSes can be reused across commits.
+        self._size_cache: Dict[VersionedName, float] = {}
+
+        # VSes stored in each commit, keyed by database path and commit ID. A commit's VSes are stored once when it
+        # is checkpointed, hence only VSes of commits not seen before need to be retrieved from the database.
+        self._stored_versioned_names_cache: Dict[Tuple[str, str], Dict[VersionedName, VersionedNameContext]] = {}
+
+        # Deeply immutable variables as of the last post-run cell update. A variable still referencing the same object
+        # is unchanged, hence its ID graph is not rebuilt. Holding the objects (instead of their IDs) prevents their
+        # IDs from being reused by new objects.
+        self._immutable_roots: Dict[str, Any] = {}
+
         # C/R plan configs.
         self._planner_context = PlannerContext(
             incremental_store=Config.get('PLANNER', 'incremental_store', False),
-            incremental_load=Config.get('PLANNER', 'incremental_load', False)  # Not used yet
+            incremental_load=Config.get('PLANNER', 'incremental_load', False),  # Not used yet
+            parallel_idgraph=Config.get('PLANNER', 'parallel_idgraph', False)
         )
 
+        # Thread pool building ID graphs if parallel_idgraph is enabled, created on first use.
+        self._idgraph_executor: Optional[ThreadPoolExecutor] = None
+
         # Used by instrumentation to compute whether data has changed.
         self._modified_vars_structure: Set[str] = set()
 
@@ -81,9 +126,10 @@ class CheckpointRestorePlanner:
         self._pre_run_cell_vars = self._user_ns.keyset()
 
         # Populate missing ID graph entries.
-        for var in self._ahg.get_variable_names():
-            if var not in self._id_graph_map and var in self._user_ns:
-                self._id_graph_map[var] = get_object_state(self._user_ns[var], {})
+        self._idgraph_cache.clear()
+        self._id_graph_map.update(self._get_object_states([
+            var for var in self._ahg.get_variable_names() if var not in self._id_graph_map and var in self._user_ns
+        ]))
 
     def post_run_cell_update(self, code_block: Optional[str], runtime_s: Optional[float]) -> ChangedVariables:
         """
@@ -99,20 +145,26 @@ class CheckpointRestorePlanner:
         self._user_ns.reset_accessed_vars()
 
         # Find created and deleted variables.
-        created_vars = self._user_ns.keyset().difference(self._pre_run_cell_vars)
-        deleted_vars = self._pre_run_cell_vars.difference(self._user_ns.keyset())
+        post_run_cell_vars = self._user_ns.keyset()
+        created_vars = post_run_cell_vars.difference(self._pre_run_cell_vars)
+        deleted_vars = self._pre_run_cell_vars.difference(post_run_cell_vars)
 
         # Find modified variables.
         modified_vars_structure = set()
         modified_vars_value = set()
-        for k in filter(self._user_ns.__contains__, self._id_graph_map.keys()):
-            new_idgraph = get_object_state(self._user_ns[k], {})
+        self._idgraph_cache.clear()
+        tracked_vars = [k for k in self._id_graph_map.keys() & post_run_cell_vars
+                        if k not in self._immutable_roots or self._immutable_roots[k] is not self._user_ns[k]]
+        new_idgraphs = self._get_object_states(tracked_vars + list(created_vars))
+        for k in tracked_vars:
+            new_idgraph = new_idgraphs[k]
+            is_value_equal, is_structure_equal = value_and_structure_equals(self._id_graph_map[k], new_idgraph)
 
             # Identify objects which have changed by value. For displaying in front end.
-            if not value_equals(self._id_graph_map[k], new_idgraph):
+            if not is_value_equal:
                 modified_vars_value.add(k)
 
-            if not self._id_graph_map[k] == new_idgraph:
+            if not is_structure_equal:
                 # Non-overwrite modification requires also accessing the variable.
                 if self._id_graph_map[k].is_root_id_and_type_equals(new_idgraph):
                     accessed_vars.add(k)
@@ -121,13 +173,19 @@ class CheckpointRestorePlanner:
 
         # Update ID graphs for newly created variables.
         for var in created_vars:
-            self._id_graph_map[var] = get_object_state(self._user_ns[var], {})
+            self._id_graph_map[var] = new_idgraphs[var]
+
+        # Record deeply immutable variables to skip rebuilding their ID graphs in the next update.
+        self._immutable_roots = {k: v for k, v in self._immutable_roots.items() if k in post_run_cell_vars}
+        for var in chain(tracked_vars, created_vars):
+            obj = self._user_ns[var]
+            if is_deeply_immutable(obj):
+                self._immutable_roots[var] = obj
+            else:
+                self._immutable_roots.pop(var, None)
 
         # Find pairs of linked variables.
-        linked_var_pairs = []
-        for x, y in combinations(self._user_ns.keyset(), 2):
-            if self._id_graph_map[x].is_overlap(self._id_graph_map[y]):
-                linked_var_pairs.append((x, y))
+        linked_var_pairs = self._find_linked_var_pairs(post_run_cell_vars)
 
         # Update AHG.
         runtime_s = 0.0 if runtime_s is None else runtime_s
@@ -136,7 +194,7 @@ class CheckpointRestorePlanner:
             version,
             runtime_s,
             accessed_vars,
-            self._user_ns.keyset(),
+            post_run_cell_vars,
             linked_var_pairs,
             modified_vars_structure,
             deleted_vars
@@ -144,6 +202,69 @@ class CheckpointRestorePlanner:
 
         return ChangedVariables(created_vars, modified_vars_value, modified_vars_structure, deleted_vars)
 
+    def _get_object_state(self, var: str) -> GraphNode:
+        """
+            Builds the ID graph of a variable. Variables referencing the same (non-primitive) object within
+            an update share the ID graph built for the first of them.
+            @param var: name of the variable in the user namespace.
+        """
+        obj = self._user_ns[var]
+        if isinstance(obj, PRIMITIVES):
+            return get_object_state(obj, {})
+
+        cached = self._idgraph_cache.get(id(obj))
+        if cached is not None and cached[0] is type(obj):
+            return cached[1]
+
+        idgraph = get_object_state(obj, {})
+        self._idgraph_cache[id(obj)] = (type(obj), idgraph)
+        return idgraph
+
+    def _get_object_states(self, var_names: List[str]) -> Dict[str, GraphNode]:
+        """
+            Builds the ID graphs of multiple variables. If enabled, the ID graphs are built in a thread pool; this
+            speeds up namespaces with large array-like variables, whose hashing releases the GIL.
+            @param var_names: names of the variables in the user namespace.
+        """
+        if not self._planner_context.parallel_idgraph or len(var_names) < 2:
+            return {var: self._get_object_state(var) for var in var_names}
+
+        # The thread pool is created on first use and reused by all subsequent updates.
+        if self._idgraph_executor is None:
+            self._idgraph_executor = ThreadPoolExecutor(thread_name_prefix="kishu-idgraph")
+        return dict(zip(var_names, self._idgraph_executor.map(self._get_object_state, var_names)))
+
+    def _find_linked_var_pairs(self, var_names: Set[str]) -> List[Tuple[str, str]]:
+        """
+            Finds pairs of linked variables, i.e., whose ID graphs share at least one object. Builds an inverted index
+            from object IDs to the variables reaching them and unions variables sharing an object, instead of testing
+            every pair of variables for overlap. Only pairs merging two components are returned, which suffices for
+            the AHG to recover the connected components (at most len(var_names) - 1 pairs).
+            @param var_names: variables to find linked pairs among.
+        """
+        obj_to_vars: Dict[int, List[str]] = defaultdict(list)
+        for var in var_names:
+            for obj_id in self._id_graph_map[var].id_set():
+                obj_to_vars[obj_id].append(var)
+
+        roots: Dict[str, str] = {}
+
+        def find_root(var: str) -> str:
+            # Path halving; iterative to not hit the recursion limit in large namespaces.
+            while roots.get(var, var) != var:
+                roots[var] = roots.get(roots[var], roots[var])
+                var = roots[var]
+            return var
+
+        linked_var_pairs: List[Tuple[str, str]] = []
+        for shared_vars in obj_to_vars.values():
+            for var in shared_vars[1:]:
+                root_var1, root_var2 = find_root(shared_vars[0]), find_root(var)
+                if root_var1 != root_var2:
+                    roots[root_var2] = root_var1
+                    linked_var_pairs.append((shared_vars[0], var))
+        return linked_var_pairs
+
     def generate_checkpoint_restore_plans(
         self,
         database_path: str,
@@ -152,23 +273,30 @@ class CheckpointRestorePlanner:
     ) -> Tuple[CheckpointPlan, RestorePlan]:
         # Retrieve active VSs from the graph. Active VSs are correspond to the latest instances/versions of each variable.
         active_vss = self._ahg.get_active_variable_snapshots()
-        for vs in active_vss:
-            for varname in vs.name:
-                """If manual commit made before init, pre-run cell update doesn't happen for new variables
-                so we need to add them to self._id_graph_map"""
-                if varname not in self._id_graph_map:
-                    self._id_graph_map[varname] = get_object_state(self._user_ns[varname], {})
-
-        # Profile the size of each variable defined in the current session.
+        self._idgraph_cache.clear()
+        """If manual commit made before init, pre-run cell update doesn't happen for new variables
+        so we need to add them to self._id_graph_map"""
+        self._id_graph_map.update(self._get_object_states([
+            varname for vs in active_vss for varname in vs.name if varname not in self._id_graph_map
+        ]))
+
+        # Profile the size of each variable defined in the current session. Sizes of VSes which are no longer active
+        # are evicted from the cache.
+        size_cache = {}
         for active_vs in active_vss:
-            active_vs.size = profile_variable_size([self._user_ns[var] for var in active_vs.name])
+            versioned_name = VersionedName(active_vs.name, active_vs.version)
+            size = self._size_cache.get(versioned_name)
+            if size is None:
+                size = profile_variable_size([self._user_ns[var] for var in active_vs.name])
+            active_vs.size = size_cache[versioned_name] = size
+        self._size_cache = size_cache
 
         # If incremental storage is enabled, retrieve list of currently stored VSes and compute VSes to
         # NOT migrate as they are already stored.
         if self._planner_context.incremental_store:
             if parent_commit_ids is None:
                 parent_commit_ids = []
-            stored_versioned_names = KishuCheckpoint(database_path).get_stored_versioned_names(parent_commit_ids)
+            stored_versioned_names = self._get_stored_versioned_names(database_path, parent_commit_ids)
             active_vss = [vs for vs in active_vss if
                           VersionedName(vs.name, vs.version) not in stored_versioned_names]
 
@@ -184,10 +312,12 @@ class CheckpointRestorePlanner:
         # Use the optimizer to compute the checkpointing configuration.
         vss_to_migrate, ces_to_recompute = optimizer.compute_plan()
 
-        # Sort variables to migrate based on cells they were created in.
-        ce_to_vs_map = defaultdict(list)
+        # Sort variables to migrate based on cells they were created in. Cell numbers are the indices of cell
+        # executions in the AHG.
+        active_vs_dict = self._ahg.get_active_variable_snapshots_dict()
+        ce_to_vs_map: List[List[FrozenSet[str]]] = [[] for _ in range(len(self._ahg.get_cell_executions()))]
         for vs_name in vss_to_migrate:
-            ce_to_vs_map[self._ahg.get_active_variable_snapshots_dict()[vs_name.name].output_ce.cell_num].append(vs_name.name)
+            ce_to_vs_map[active_vs_dict[vs_name.name].output_ce.cell_num].append(vs_name.name)
 
         if self._planner_context.incremental_store:
             # Create incremental checkpoint plan using optimization results.
@@ -195,7 +325,7 @@ class CheckpointRestorePlanner:
                 self._user_ns,
                 database_path,
                 commit_id,
-                list(self._ahg.get_active_variable_snapshots_dict()[vn.name] for vn in vss_to_migrate)
+                list(active_vs_dict[vn.name] for vn in vss_to_migrate)
             )
 
         else:
@@ -212,38 +342,64 @@ class CheckpointRestorePlanner:
 
         return checkpoint_plan, restore_plan
 
+    def _get_stored_versioned_names(
+        self,
+        database_path: str,
+        commit_ids: List[str]
+    ) -> Dict[VersionedName, VersionedNameContext]:
+        """
+            Retrieves the VSes stored in the commits, querying the database only for commits not seen before.
+            @param database_path: path to the checkpoint database.
+            @param commit_ids: commits to retrieve stored VSes of.
+        """
+        missing_commit_ids = [commit_id for commit_id in commit_ids
+                              if (database_path, commit_id) not in self._stored_versioned_names_cache]
+        if missing_commit_ids:
+            # Cache entries are only added once the query succeeds, so failed queries are retried.
+            stored = KishuCheckpoint(database_path).get_stored_versioned_names(missing_commit_ids)
+            stored_by_commit: Dict[str, Dict[VersionedName, VersionedNameContext]] = {
+                commit_id: {} for commit_id in missing_commit_ids}
+            for versioned_name, context in stored.items():
+                stored_by_commit[context.commit_id][versioned_name] = context
+            self._stored_versioned_names_cache.update(
+                ((database_path, commit_id), vns) for commit_id, vns in stored_by_commit.items())
+
+        stored_versioned_names: Dict[VersionedName, VersionedNameContext] = {}
+        for commit_id in commit_ids:
+            stored_versioned_names.update(self._stored_versioned_names_cache[(database_path, commit_id)])
+        return stored_versioned_names
+
     def _generate_restore_plan(
         self,
         ces_to_recompute: Set[int],
-        ce_to_vs_map: Dict[int, List[FrozenSet[str]]],
+        ce_to_vs_map: List[List[FrozenSet[str]]],
         req_func_mapping: Dict[int, Set[int]]
     ) -> RestorePlan:
         """
             Generates a restore plan based on results from the optimizer.
             @param ces_to_recompute: cell executions to rerun upon restart.
-            @param ce_to_vs_map: Mapping from cell number to active variables last modified there
+            @param ce_to_vs_map: Active variables last modified in each cell, indexed by cell number
             @param req_func_mapping: Mapping from a cell number to all prerequisite cell numbers required
                 to rerun it
         """
         restore_plan = RestorePlan()
 
-        ce_dict = {ce.cell_num: ce for ce in self._ahg.get_cell_executions()}
+        # Cell executions are stored in chronological order, which is already a topological order of their
+        # dependencies; a single pass over them emits restore actions in dependency order.
+        ces = self._ahg.get_cell_executions()
+        cell_by_num = {ce.cell_num: ce.cell for ce in ces}
 
-        for ce in self._ahg.get_cell_executions():
+        for ce in ces:
             # Add a rerun cell restore action if the cell needs to be rerun
             if ce.cell_num in ces_to_recompute:
                 restore_plan.add_rerun_cell_restore_action(ce.cell_num, ce.cell)
 
             # Add a load variable restore action if there are variables from the cell that needs to be stored
-            if len(ce_to_vs_map[ce.cell_num]) > 0:
-                name_list: List[str] = []
-                for vs in ce_to_vs_map[ce.cell_num]:
-                    for name in vs.name:
-                        name_list.append(name)
+            if ce_to_vs_map[ce.cell_num]:
                 restore_plan.add_load_variable_restore_action(
                         ce.cell_num,
-                        name_list,
-                        [(cell_num, ce_dict[cell_num].cell) for cell_num in req_func_mapping[ce.cell_num]])
+                        list(chain.from_iterable(ce_to_vs_map[ce.cell_num])),
+                        [(cell_num, cell_by_num[cell_num]) for cell_num in req_func_mapping[ce.cell_num]])
         return restore_plan
 
     def get_ahg(self) -> AHG:
@@ -268,9 +424,20 @@ class CheckpointRestorePlanner:
             Called when a checkout is performed.
         """
         self._ahg = AHG.deserialize(new_ahg_string)
-        self._user_ns = new_user_ns
-
-        # Also clear the old ID graphs and pre-run cell info.
-        # TODO: only clear ID graphs of variables which have changed between pre and post-checkout.
-        self._id_graph_map = {}
+        old_user_ns, self._user_ns = self._user_ns, new_user_ns
+
+        # Keep the ID graphs of variables referencing the same objects pre and post-checkout; the ID graphs of other
+        # variables are rebuilt in the next pre-run cell update. Objects of the old namespace are still alive here,
+        # hence matching object identities cannot stem from reused IDs. A namespace updated in place cannot be diffed.
+        unchanged_vars = set()
+        if new_user_ns is not old_user_ns:
+            unchanged_vars = {k for k in self._id_graph_map.keys() & new_user_ns.keyset()
+                              if k in old_user_ns and old_user_ns[k] is new_user_ns[k]}
+        self._id_graph_map = {k: v for k, v in self._id_graph_map.items() if k in unchanged_vars}
+        self._immutable_roots = {k: v for k, v in self._immutable_roots.items() if k in unchanged_vars}
+
+        # Also clear the other caches and pre-run cell info.
+        self._idgraph_cache.clear()
+        self._size_cache = {}
+        self._stored_versioned_names_cache = {}
         self._pre_run_cell_vars = set()
\ No newline at end of file
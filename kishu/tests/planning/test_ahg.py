@@ -1,4 +1,6 @@
-from kishu.planning.ahg import AHG, VariableSnapshot
+import dill
+
+from kishu.planning.ahg import AHG, VariableSnapshot, VersionedName
 
 
 def test_add_cell_execution():
@@ -169,3 +171,27 @@ def test_create_vs_modify_connected_component():
 
     # 2 connected components
     assert set(vs.name for vs in active_variable_snapshots) == {frozenset({"c", "b"}), frozenset("a")}
+
+
+def test_cached_lookups_invalidated_on_update():
+    ahg = AHG()
+
+    ahg.update_graph("", 1, 1, {}, {"x", "y"}, [], {}, {})
+    assert ahg.get_variable_names() == {"x", "y"}
+
+    # Lookups are reused until the graph changes.
+    assert ahg.get_variable_names() is ahg.get_variable_names()
+    assert ahg.get_active_variable_snapshots() is ahg.get_active_variable_snapshots()
+
+    # x is modified, z is created, y is deleted.
+    ahg.update_graph("", 2, 1, {"x"}, {"x", "z"}, [], {"x"}, {"y"})
+    assert ahg.get_variable_names() == {"x", "z"}
+    assert {vs.version for vs in ahg.get_active_variable_snapshots()} == {2}
+
+    # Replacing the active VSes (i.e., checking out) also invalidates the lookups.
+    ahg.replace_active_vses([VersionedName(frozenset("x"), 1), VersionedName(frozenset("y"), 1)])
+    assert ahg.get_variable_names() == {"x", "y"}
+    assert {vs.version for vs in ahg.get_active_variable_snapshots()} == {1}
+
+    # The cache is not serialized.
+    assert "get_variable_names" not in dill.loads(ahg.serialize())._cache
@@ -7,7 +7,7 @@ import pandas as pd
 import scipy.io as sio
 import seaborn as sns
 
-from kishu.planning.idgraph import get_object_hash, get_object_state, value_equals
+from kishu.planning.idgraph import get_object_hash, get_object_state, value_and_structure_equals, value_equals
 
 
 def test_idgraph_simple_list_compare_by_value():
@@ -54,6 +54,28 @@ def test_idgraph_dict_compare_by_value():
     assert value_equals(idgraph1, idgraph2)
 
 
+def test_idgraph_value_and_structure_equals():
+    """
+        Test if comparing by value and structure in a single traversal agrees with the separate comparisons.
+    """
+    a = [1, 2]
+    b = [a, {"foo": float("nan")}]
+    idgraph1 = get_object_state(b, {})
+    assert value_and_structure_equals(idgraph1, get_object_state(b, {})) == (True, True)
+
+    # reference swap
+    b[0] = [1, 2]
+    idgraph2 = get_object_state(b, {})
+    assert value_and_structure_equals(idgraph1, idgraph2) == (value_equals(idgraph1, idgraph2), idgraph1 == idgraph2)
+    assert value_and_structure_equals(idgraph1, idgraph2) == (True, False)
+
+    # value change
+    b[0].append(3)
+    idgraph3 = get_object_state(b, {})
+    assert value_and_structure_equals(idgraph2, idgraph3) == (value_equals(idgraph2, idgraph3), idgraph2 == idgraph3)
+    assert value_and_structure_equals(idgraph2, idgraph3) == (False, False)
+
+
 def test_idgraph_numpy():
     """
         Test if idgraph is accurately generated for numpy arrays
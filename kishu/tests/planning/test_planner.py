@@ -1,9 +1,12 @@
 import copy
 import pytest
+import sqlite3
 
 from typing import Any, Dict, Generator, List, Optional, Set, Tuple
 
 from kishu.jupyter.namespace import Namespace
+from kishu.planning.ahg import VariableSnapshot, VersionedName
+from kishu.planning.idgraph import GraphNode, get_object_state
 from kishu.planning.planner import CheckpointRestorePlanner, ChangedVariables
 from kishu.planning.plan import CheckpointPlan, RestoreActionOrder, RestorePlan, StepOrder
 from kishu.storage.checkpoint import KishuCheckpoint
@@ -30,6 +33,13 @@ def enable_always_migrate(tmp_kishu_path) -> Generator[type, None, None]:
     Config.set('OPTIMIZER', 'always_migrate', False)
 
 
+@pytest.fixture()
+def enable_parallel_idgraph(tmp_kishu_path) -> Generator[type, None, None]:
+    Config.set('PLANNER', 'parallel_idgraph', True)
+    yield Config
+    Config.set('PLANNER', 'parallel_idgraph', False)
+
+
 class PlannerManager:
     """
         Class for automating pre and post-run-cell function calls in Planner.
@@ -140,6 +150,184 @@ def test_post_run_cell_update_return(enable_always_migrate):
     )
 
 
+def test_post_run_cell_update_parallel_idgraph(enable_parallel_idgraph):
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    # Run cell 1.
+    x = [1, 2]
+    changed_vars = planner_manager.run_cell({"x": x, "y": {"foo": x}, "z": [3]}, "x = [1, 2]\ny = {'foo': x}\nz = [3]")
+    assert changed_vars.created_vars == {"x", "y", "z"}
+    executor = planner_manager.planner._idgraph_executor
+    assert executor is not None
+
+    # Run cell 2.
+    x.append(3)
+    changed_vars = planner_manager.run_cell({"w": 4}, "x.append(3)\nw = 4")
+    assert changed_vars == ChangedVariables(
+        created_vars={"w"},
+        modified_vars_value={"x", "y"},
+        modified_vars_structure={"x", "y"},
+        deleted_vars=set()
+    )
+
+    # The thread pool is reused across cells.
+    assert planner_manager.planner._idgraph_executor is executor
+
+
+def test_post_run_cell_update_linked_variables():
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    # x and y share a reference to the same list, z does not.
+    x = [1, 2]
+    planner_manager.run_cell({"x": x, "y": {"foo": x}, "z": [1, 2]}, "x = [1, 2]\ny = {'foo': x}\nz = [1, 2]")
+
+    active_vs_names = set(planner_manager.planner.get_ahg().get_active_variable_snapshots_dict().keys())
+    assert active_vs_names == {frozenset({"x", "y"}), frozenset({"z"})}
+
+
+def test_post_run_cell_update_transitively_linked_variables():
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    # x and z do not share a reference directly, but are linked through y.
+    a, b = [1], [2]
+    planner_manager.run_cell({"x": [a], "y": [a, b], "z": [b], "w": [3]}, "x = [a]\ny = [a, b]\nz = [b]\nw = [3]")
+
+    active_vs_names = set(planner_manager.planner.get_ahg().get_active_variable_snapshots_dict().keys())
+    assert active_vs_names == {frozenset({"x", "y", "z"}), frozenset({"w"})}
+
+
+def test_post_run_cell_update_aliased_variables_share_idgraph():
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    # y references the same list as x; its ID graph is built only once.
+    x = [1, 2]
+    planner_manager.run_cell({"x": x, "y": x}, "x = [1, 2]\ny = x")
+
+    id_graph_map = planner_manager.planner.get_id_graph_map()
+    assert id_graph_map["x"] is id_graph_map["y"]
+
+    # Modifying the shared list is detected for both variables.
+    x.append(3)
+    changed_vars = planner_manager.run_cell({}, "x.append(3)")
+    assert changed_vars.modified_vars_value == {"x", "y"}
+
+
+def test_post_run_cell_update_skips_unchanged_immutable_variables(monkeypatch):
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    built_objs: List[Any] = []
+
+    def mock_get_object_state(obj: Any, visited: dict, *args, **kwargs) -> GraphNode:
+        built_objs.append(obj)
+        return get_object_state(obj, visited, *args, **kwargs)
+    monkeypatch.setattr("kishu.planning.planner.get_object_state", mock_get_object_state)
+
+    # Run cell 1.
+    t1, t2 = (1, ("a", 2.0)), ([1], 2)
+    planner_manager.run_cell({"t1": t1, "t2": t2}, "t1 = (1, ('a', 2.0)); t2 = ([1], 2)")
+
+    # Run cell 2. The ID graph of the deeply immutable 't1' is not rebuilt.
+    built_objs.clear()
+    t2[0].append(2)
+    changed_vars = planner_manager.run_cell({}, "t2[0].append(2)")
+    assert t1 not in built_objs
+    assert changed_vars.modified_vars_structure == {"t2"}
+
+    # Run cell 3. 't1' is reassigned.
+    changed_vars = planner_manager.run_cell({"t1": (1, ("b", 2.0))}, "t1 = (1, ('b', 2.0))")
+    assert changed_vars.modified_vars_value == {"t1"}
+
+
+def test_replace_state_keeps_unchanged_idgraphs():
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+    x, y = [1], [2]
+    planner_manager.run_cell({"x": x, "y": y, "z": 3}, "x = [1]; y = [2]; z = 3")
+    old_id_graph_map = copy.copy(planner_manager.planner.get_id_graph_map())
+
+    # Check out a state where 'x' is unchanged, 'y' is restored to a new object and 'z' is deleted.
+    planner_manager.planner.replace_state(
+        planner_manager.planner.serialize_ahg().decode("latin1"),
+        Namespace({"x": x, "y": [2]})
+    )
+
+    # Only the ID graph of 'x' is kept.
+    assert planner_manager.planner.get_id_graph_map().keys() == {"x"}
+    assert planner_manager.planner.get_id_graph_map()["x"] is old_id_graph_map["x"]
+
+
+def test_checkpoint_restore_planner_reuses_profiled_sizes(enable_always_migrate, monkeypatch):
+    filename = KishuPath.database_path("test")
+    KishuCheckpoint(filename).init_database()
+
+    planner_manager = PlannerManager(CheckpointRestorePlanner(Namespace({})))
+
+    profiled_vars: List[Any] = []
+
+    def mock_profile_variable_size(data: Any) -> float:
+        profiled_vars.extend(data)
+        return 1.0
+    monkeypatch.setattr("kishu.planning.planner.profile_variable_size", mock_profile_variable_size)
+
+    # Run cell 1.
+    planner_manager.run_cell({"x": 1}, "x = 1")
+    planner_manager.checkpoint_session(filename, "1:1", [])
+    assert profiled_vars == [1]
+
+    # Run cell 2. Only the newly created 'y' is profiled.
+    planner_manager.run_cell({"y": 2}, "y = x + 1")
+    planner_manager.checkpoint_session(filename, "1:2", ["1:1"])
+    assert profiled_vars == [1, 2]
+
+    # Run cell 3. The modified 'x' is profiled again.
+    planner_manager.run_cell({"x": 3}, "x = 3")
+    planner_manager.checkpoint_session(filename, "1:3", ["1:2"])
+    assert profiled_vars == [1, 2, 3]
+
+
+def test_checkpoint_restore_planner_caches_stored_versioned_names(tmp_kishu_path, monkeypatch):
+    filename = KishuPath.database_path("test")
+    KishuCheckpoint(filename).init_database()
+    user_ns = Namespace({"x": 1, "y": 2})
+    KishuCheckpoint(filename).store_variable_snapshots("1:1", [VariableSnapshot(frozenset("x"), 1)], user_ns)
+    KishuCheckpoint(filename).store_variable_snapshots("1:2", [VariableSnapshot(frozenset("y"), 2)], user_ns)
+
+    planner = CheckpointRestorePlanner(user_ns)
+
+    queried_commit_ids: List[List[str]] = []
+    get_stored_versioned_names = KishuCheckpoint.get_stored_versioned_names
+
+    def mock_get_stored_versioned_names(self, commit_ids: List[str]):
+        queried_commit_ids.append(commit_ids)
+        return get_stored_versioned_names(self, commit_ids)
+    monkeypatch.setattr(KishuCheckpoint, "get_stored_versioned_names", mock_get_stored_versioned_names)
+
+    assert planner._get_stored_versioned_names(filename, ["1:1"]).keys() == {VersionedName(frozenset("x"), 1)}
+    assert planner._get_stored_versioned_names(filename, ["1:1", "1:2"]).keys() == \
+        {VersionedName(frozenset("x"), 1), VersionedName(frozenset("y"), 2)}
+
+    # Only commits not seen before are queried.
+    assert queried_commit_ids == [["1:1"], ["1:2"]]
+
+
+def test_checkpoint_restore_planner_retries_failed_stored_versioned_names(tmp_kishu_path, monkeypatch):
+    filename = KishuPath.database_path("test")
+    KishuCheckpoint(filename).init_database()
+    user_ns = Namespace({"x": 1})
+    KishuCheckpoint(filename).store_variable_snapshots("1:1", [VariableSnapshot(frozenset("x"), 1)], user_ns)
+
+    planner = CheckpointRestorePlanner(user_ns)
+
+    def mock_get_stored_versioned_names(self, commit_ids: List[str]):
+        raise sqlite3.OperationalError("database is locked")
+    with monkeypatch.context() as m:
+        m.setattr(KishuCheckpoint, "get_stored_versioned_names", mock_get_stored_versioned_names)
+        with pytest.raises(sqlite3.OperationalError):
+            planner._get_stored_versioned_names(filename, ["1:1"])
+
+    # The failed query is not cached as the commit storing no VSes.
+    assert planner._get_stored_versioned_names(filename, ["1:1"]).keys() == {VersionedName(frozenset("x"), 1)}
+
+
 def test_checkpoint_restore_planner_incremental_store_simple(enable_incremental_store, enable_always_migrate):
     """
         Test incremental store.
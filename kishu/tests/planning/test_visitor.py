@@ -5,6 +5,11 @@ import seaborn as sns
 import pickle
 
 
+class ValueHolder:
+    def __init__(self):
+        self.v = 1
+
+
 def test_idgraph_numpy():
     """
         Test if idgraph is accurately generated for numpy arrays
@@ -58,6 +63,48 @@ def test_hash_numpy():
     assert hash1.digest() == hash4.digest()
 
 
+def test_idgraph_numpy_reshape():
+    """
+        Test if idgraph of numpy arrays accounts for the array shape and not only its buffer
+    """
+    a = np.arange(6)
+    idgraph1 = object_state.create_idgraph(a)
+
+    a.shape = (2, 3)
+    idgraph2 = object_state.create_idgraph(a)
+
+    # Assert that the id graph changes when the object is reshaped in place
+    assert idgraph1 != idgraph2
+
+
+def test_idgraph_numpy_masked_array():
+    """
+        Test if idgraph of numpy masked arrays accounts for the mask and not only the data buffer
+    """
+    m = np.ma.array([1, 2, 3], mask=[0, 0, 0])
+    idgraph1 = object_state.create_idgraph(m)
+
+    m.mask[0] = True
+    idgraph2 = object_state.create_idgraph(m)
+
+    # Assert that the id graph changes when the mask is modified in place
+    assert idgraph1 != idgraph2
+
+
+def test_hash_ints_and_floats():
+    """
+        Test if hash distinguishes ints (of any size) and floats of the same value
+    """
+    hash1 = object_state.create_hash([2 ** 70, -1, 1])
+    hash2 = object_state.create_hash([2 ** 70, -1, 1])
+    hash3 = object_state.create_hash([2 ** 70, 1, 1])
+    hash4 = object_state.create_hash([2 ** 70, -1, 1.0])
+
+    assert hash1.digest() == hash2.digest()
+    assert hash1.digest() != hash3.digest()
+    assert hash1.digest() != hash4.digest()
+
+
 def test_idgraph_pandas_Series():
     """
         Test if idgraph is accurately generated for pandas series
@@ -152,6 +199,49 @@ def test_idgraph_pandas_df():
     assert idgraph1 != idgraph5
 
 
+def test_idgraph_pandas_df_columns():
+    """
+        Test if idgraph of pandas dataframes accounts for column names
+    """
+    df = pd.DataFrame({"a": [1, 2], "b": [1.0, 2.0]})
+    idgraph1 = object_state.create_idgraph(df)
+
+    df.rename(columns={"a": "c"}, inplace=True)
+    idgraph2 = object_state.create_idgraph(df)
+
+    # Assert that the id graph changes when a column is renamed
+    assert idgraph1 != idgraph2
+
+
+def test_idgraph_pandas_df_object_column():
+    """
+        Test if idgraph of pandas dataframes detects modifications to objects in object dtype columns
+    """
+    c = ValueHolder()
+    df = pd.DataFrame({"a": [c, 2]})
+    idgraph1 = object_state.create_idgraph(df)
+
+    c.v = 2
+    idgraph2 = object_state.create_idgraph(df)
+
+    # Assert that the id graph changes when an object in the dataframe is modified
+    assert idgraph1 != idgraph2
+
+
+def test_idgraph_pandas_df_extension_dtype():
+    """
+        Test if idgraph of pandas dataframes with extension dtypes detects in place modifications
+    """
+    df = pd.DataFrame({"a": pd.array([1, None], dtype="Int64"), "b": pd.Categorical(["x", "y"])})
+    idgraph1 = object_state.create_idgraph(df)
+
+    df.loc[0, "a"] = 5
+    idgraph2 = object_state.create_idgraph(df)
+
+    # Assert that the id graph changes when a value in the dataframe is modified
+    assert idgraph1 != idgraph2
+
+
 def test_hash_pandas_df():
     """
         Test if hash is accurately generated for pandas dataframes